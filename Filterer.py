@@ -16,14 +16,25 @@ This is a problem for Notepad in Windows which doesn't recognize the new line.
 """
 import sys
 import io
-import chardet
+import codecs
+from array import array
+from bisect import bisect_right
 
 from PyQt5.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QLineEdit,
                              QPlainTextEdit, QToolBar, QWidget, QPushButton,
                              QAction, QFileDialog, QApplication, QMessageBox,
                              QCheckBox, QLabel)
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
+
+# number of bytes from the start of a file to detect its encoding from
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# milliseconds to wait after the last keystroke before live filtering
+LIVE_FILTERING_DELAY = 80
+
+# number of lines from the start of a file to fit the window width to
+WINDOW_WIDTH_SAMPLE_LINES = 100
 
 APP_USAGE_GUIDE = """
 Usage guide
@@ -89,6 +100,22 @@ class MainWindow(QMainWindow):
         self.display = QPlainTextEdit()
         # no text data is loaded initially
         self.textfile_data = None
+        # the text is kept as a single string along with the offsets
+        # of the line starts in it rather than as a list of lines
+        self._text_starts = array('q')
+        # casefolded copy of the whole text used for filtering and
+        # the offsets of the line starts in it
+        self._lower_blob = ''
+        self._line_starts = array('q')
+        # the last used filter and the numbers of the lines it matched
+        self._last_needle = ''
+        self._last_matches = []
+
+        # live filtering is run once the user stops typing
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(LIVE_FILTERING_DELAY)
+        self._filter_timer.timeout.connect(self.filter_display)
 
         # add text line to enter filter
         self.build_filter_line()
@@ -208,10 +235,18 @@ class MainWindow(QMainWindow):
     def handle_filtering_mode(self):
         """Handle filtering mode."""
         if self.do_live_search_checkbox.isChecked():
-            self.line_edit.textChanged.connect(self.filter_button.click)
+            self.line_edit.textChanged.connect(self.schedule_filtering)
             self.filter_button.click()
         else:
-            self.line_edit.textChanged.disconnect(self.filter_button.click)
+            self._filter_timer.stop()
+            self.line_edit.textChanged.disconnect(self.schedule_filtering)
+
+    def schedule_filtering(self):
+        """Filter displayed text rows once the user has stopped typing.
+        Every keystroke restarts the timer, so a burst of keystrokes
+        results in a single filtering.
+        """
+        self._filter_timer.start()
 
     def build_display(self):
         """Build the display window (the main text block)."""
@@ -236,36 +271,110 @@ class MainWindow(QMainWindow):
         Leave only those rows that have the entered string.
         This is triggered by clicking the Filter button.
         """
+        # filtering now makes any pending live filtering redundant
+        self._filter_timer.stop()
         filter_text_data = self.line_edit.text()
 
         # if user has not entered any string, the whole file is shown
         if not filter_text_data:
-            self.display.setPlainText(''.join(self.textfile_data))
+            self._last_needle = ''
+            self._last_matches = []
+            self._set_display_text(self.textfile_data)
             return
 
         # otherwise only the rows with the string in them are shown
-        self.display.setPlainText(''.join([
-            i for i in self.textfile_data
-            if filter_text_data.lower() in i.lower()
-        ]))
+        needle = filter_text_data.casefold()
+        last_needle, last_matches = self._last_needle, self._last_matches
+        if last_needle and last_needle in needle:
+            # the filter has been extended, so only the lines
+            # matched by the previous one may still match
+            matches = self._refine_matching_lines(needle, last_matches)
+        else:
+            matches = self._find_matching_lines(needle)
+        self._last_needle = needle
+        self._last_matches = matches
+
+        # the display already shows these lines, e.g. when the Enter key
+        # is pressed after live filtering or an extended filter
+        # matches the same lines, so there is no need to rebuild it
+        if last_needle and matches == last_matches:
+            return
+
+        text = self.textfile_data
+        text_starts = self._text_starts
+        self._set_display_text(''.join(
+            [text[text_starts[i]:text_starts[i + 1]] for i in matches]))
+
+    def _set_display_text(self, text):
+        """Replace the text in the display repainting it only once."""
+        self.display.setUpdatesEnabled(False)
+        try:
+            self.display.setPlainText(text)
+        finally:
+            self.display.setUpdatesEnabled(True)
+
+    def _find_matching_lines(self, needle):
+        """Find numbers of the lines containing the casefolded needle.
+        The text was casefolded once on load, so it is scanned as a whole
+        and every hit is mapped back to the line it belongs to.
+        """
+        # a line may only end with a new line, so a needle with a new line
+        # anywhere else would only be found across the line boundaries
+        if '\n' in needle[:-1]:
+            return []
+
+        lower_blob = self._lower_blob
+        line_starts = self._line_starts
+        matches = []
+        idx = lower_blob.find(needle)
+        while idx != -1:
+            line_no = bisect_right(line_starts, idx) - 1
+            matches.append(line_no)
+            # the line is matched already, continue from the next one
+            idx = lower_blob.find(needle, line_starts[line_no + 1])
+        return matches
+
+    def _refine_matching_lines(self, needle, line_numbers):
+        """Leave only numbers of the lines containing the casefolded needle."""
+        find = self._lower_blob.find
+        line_starts = self._line_starts
+        return [
+            i for i in line_numbers
+            if find(needle, line_starts[i], line_starts[i + 1]) != -1
+        ]
 
     def open_file(self):
         """Open text file to load into the main display window."""
         name = QFileDialog.getOpenFileName(self, "Open text file")
         file_path = name[0]
         if file_path:
+            # the file is read once, its encoding is detected from the start
+            with open(file_path, 'rb') as f:
+                data = f.read()
             try:
-                self.encoding = self._detect_encoding(file_path)
-                with io.open(file_path, encoding=self.encoding) as f:
-                    self.textfile_data = f.readlines()
+                self.encoding = self._detect_encoding(
+                    data[:ENCODING_SAMPLE_SIZE])
+                text = data.decode(self.encoding)
             except Exception:
                 # if we failed to guess the encoding, fall back to UTF-8
                 self.encoding = 'utf-8'
-                with io.open(file_path, encoding=self.encoding) as f:
-                    self.textfile_data = f.readlines()
+                text = data.decode(self.encoding, errors='replace')
+            del data
+
+            # translate new lines as reading a file in the text mode would do
+            self.textfile_data = text.replace('\r\n', '\n').replace('\r', '\n')
+            del text
+            self._text_starts = self._find_line_starts(self.textfile_data)
+
+            # casefold the text once so that filtering doesn't have to;
+            # casefolding may change the length of a line, so the offsets
+            # of the lines in the casefolded copy are found separately
+            self._lower_blob = self.textfile_data.casefold()
+            self._line_starts = self._find_line_starts(self._lower_blob)
+            self._last_needle = ''
+            self._last_matches = []
 
-            longest_textline = max([(i) for i in self.textfile_data], key=len)
-            self.display.setPlainText("".join(self.textfile_data))
+            self._set_display_text(self.textfile_data)
 
             if self.textfile_data:
                 # file is not empty
@@ -273,9 +382,18 @@ class MainWindow(QMainWindow):
                 self.line_edit.setDisabled(False)
                 self.display.setDisabled(False)
 
-                self.resize(
-                    self.display.fontMetrics().width(longest_textline) + 50,
-                    self.height())
+                # widen the window to fit the longest of the first lines,
+                # but don't grow past the screen or shrink the window
+                sample_lines = min(WINDOW_WIDTH_SAMPLE_LINES,
+                                   len(self._text_starts) - 1)
+                sample = self.textfile_data[:self._text_starts[sample_lines]]
+                longest_textline = max(sample.split('\n'), key=len)
+                text_width = self.display.fontMetrics().horizontalAdvance(
+                    longest_textline) + 50
+                screen = QApplication.primaryScreen().availableGeometry()
+                width = min(text_width, screen.width())
+                if self.width() < width:
+                    self.resize(width, self.height())
 
                 # let user start typing into the line edit immediately after loading
                 self.line_edit.setFocus()
@@ -300,7 +418,13 @@ class MainWindow(QMainWindow):
     def close_file(self):
         """Close the opened file. The text is removed and the tools are disabled."""
         self.line_edit.setText("")
+        self._filter_timer.stop()
         self.display.setPlainText("")
+        self._text_starts = array('q')
+        self._lower_blob = ''
+        self._line_starts = array('q')
+        self._last_needle = ''
+        self._last_matches = []
         self.filter_button.setDisabled(True)
         self.line_edit.setDisabled(True)
         self.display.setDisabled(True)
@@ -308,11 +432,49 @@ class MainWindow(QMainWindow):
         self.open_file_path_label.setText('')
 
     @staticmethod
-    def _detect_encoding(file_path):
-        """Detect encoding of the input file."""
-        with open(file_path, 'rb') as f:
-            data = f.readline(1000)
-            return chardet.detect(data)['encoding']
+    def _find_line_starts(text):
+        """Find offsets of the line starts in the text.
+        The length of the text is appended, so that the line `i` spans
+        from `starts[i]` to `starts[i + 1]`.
+        """
+        starts = array('q', [0])
+        idx = text.find('\n')
+        while idx != -1:
+            starts.append(idx + 1)
+            idx = text.find('\n', idx + 1)
+        if starts[-1] != len(text):
+            starts.append(len(text))
+        return starts
+
+    @staticmethod
+    def _detect_encoding(data):
+        """Detect encoding of the input file from its first bytes."""
+        # files with a byte order mark and UTF-8 (including plain ASCII)
+        # files are recognized without chardet; UTF-32 marks go first
+        # as they start with the UTF-16 ones
+        if data.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if data.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+            return 'utf-32'
+        if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        try:
+            # a sample cut short of the whole file may end in the middle
+            # of a character, but a whole file may not
+            codecs.getincrementaldecoder('utf-8')().decode(
+                data, final=len(data) < ENCODING_SAMPLE_SIZE)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
+        # chardet is slow to import, so it is loaded only when needed.
+        # It is kept on purpose as the faster libraries misdetect
+        # short Cyrillic texts such as those in `chartests`:
+        # charset_normalizer reads IBM866 and Windows-1251 as cp1125 and
+        # KOI8-R and ISO-8859-5 as cp932; cchardet reads IBM866 as BIG5
+        # and IBM855 as ISO-8859-5
+        import chardet
+        return chardet.detect(data)['encoding']
 
 
 if __name__ == '__main__':
@@ -1,10 +1,21 @@
+import codecs
+from pathlib import Path
 from unittest.mock import patch
 
+import pytest
+
 from PyQt5.Qt import Qt
 from PyQt5.QtTest import QTest
 from PyQt5.QtWidgets import QMessageBox
 
-from Filterer import MainWindow
+from Filterer import ENCODING_SAMPLE_SIZE, MainWindow
+
+
+@pytest.fixture(autouse=True)
+def confirm_quit():
+    """Answer the quit prompt shown when qtbot closes the windows."""
+    with patch('Filterer.QMessageBox.question', lambda *args: QMessageBox.Yes):
+        yield
 
 
 def test_app(qtbot, tmp_path):
@@ -44,3 +55,188 @@ def test_app(qtbot, tmp_path):
 
     with patch('Filterer.QMessageBox.question', lambda *args: QMessageBox.Yes):
         QTest.keyPress(ui, Qt.Key_Q, Qt.ControlModifier)
+
+
+def test_live_filtering_is_delayed(qtbot, tmp_path):
+    ui = MainWindow()
+    ui.show()
+    QTest.qWaitForWindowExposed(ui)
+
+    datafile = tmp_path.joinpath("cities.txt")
+    datafile.write_text("City1\nCity2\nCity12\n")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    for char in "City1":
+        QTest.keyClick(ui.line_edit, char)
+    # nothing is filtered while the user is typing
+    assert ui._filter_timer.isActive()
+    assert ui.display.toPlainText() == "City1\nCity2\nCity12\n"
+
+    with qtbot.waitSignal(ui._filter_timer.timeout):
+        pass
+    assert ui.display.toPlainText() == "City1\nCity12\n"
+
+    with patch('Filterer.QMessageBox.question', lambda *args: QMessageBox.Yes):
+        ui.close()
+
+
+def test_filter_display(qtbot, tmp_path):
+    ui = MainWindow()
+    qtbot.addWidget(ui)
+
+    datafile = tmp_path.joinpath("streets.txt")
+    datafile.write_text(
+        "Straße 1, Strasse 2\nMain street\nSTRASSE 3\nNo newline ß",
+        encoding="utf-8")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    # a line with several hits is shown once and casefolding
+    # is applied to both the text and the filter
+    ui.line_edit.setText("STRASSE")
+    ui.filter_display()
+    assert ui.display.toPlainText() == "Straße 1, Strasse 2\nSTRASSE 3\n"
+
+    ui.line_edit.setText("ß")
+    ui.filter_display()
+    assert ui.display.toPlainText() == (
+        "Straße 1, Strasse 2\nSTRASSE 3\nNo newline ß")
+
+    # the last line doesn't end with a new line
+    ui.line_edit.setText("newline")
+    ui.filter_display()
+    assert ui.display.toPlainText() == "No newline ß"
+
+    ui.line_edit.setText("street")
+    ui.filter_display()
+    assert ui.display.toPlainText() == "Main street\n"
+
+    # a filter with a new line matches only at the end of a line
+    ui.line_edit.setText("street\n")
+    ui.filter_display()
+    assert ui.display.toPlainText() == "Main street\n"
+
+    ui.line_edit.setText("2\nmain")
+    ui.filter_display()
+    assert ui.display.toPlainText() == ""
+
+
+def test_filter_display_refines_previous_matches(qtbot, tmp_path):
+    ui = MainWindow()
+    qtbot.addWidget(ui)
+
+    datafile = tmp_path.joinpath("cities.txt")
+    datafile.write_text("City1\nCity2\nCity12\nTown1\n")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    for filter_text, expected in [("city", "City1\nCity2\nCity12\n"),
+                                  ("city1", "City1\nCity12\n"),
+                                  ("ity12", "City12\n"),
+                                  ("1", "City1\nCity12\nTown1\n"),
+                                  ("", "City1\nCity2\nCity12\nTown1\n"),
+                                  ("2", "City2\nCity12\n")]:
+        ui.line_edit.setText(filter_text)
+        ui.filter_display()
+        assert ui.display.toPlainText() == expected
+
+
+def test_open_empty_file(qtbot, tmp_path):
+    ui = MainWindow()
+    qtbot.addWidget(ui)
+
+    datafile = tmp_path.joinpath("empty.txt")
+    datafile.write_text("")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    assert ui.display.toPlainText() == ''
+    assert not ui.line_edit.isEnabled()
+
+
+@pytest.mark.parametrize("data, encoding", [
+    ("text".encode("utf-8-sig"), "utf-8-sig"),
+    ("text".encode("utf-16"), "utf-16"),
+    ("text".encode("utf-32"), "utf-32"),
+    (b"plain ASCII text", "utf-8"),
+    # the sample cut from a larger file ends in the middle
+    # of a two byte character
+    ((b"a" + "л".encode("utf-8") * ENCODING_SAMPLE_SIZE)
+     [:ENCODING_SAMPLE_SIZE], "utf-8"),
+])
+def test_detect_encoding(data, encoding):
+    assert MainWindow._detect_encoding(data) == encoding
+
+
+def test_detect_encoding_of_whole_short_file():
+    # the last byte of a whole file is not a truncated UTF-8 character
+    data = "café".encode("cp1252")
+    assert data.decode(MainWindow._detect_encoding(data)) == "café"
+
+
+@pytest.mark.parametrize("file_name, encoding", [
+    ("IBM855.txt", "IBM855"),
+    ("IBM866.txt", "IBM866"),
+    ("ISO-8859-5.txt", "ISO-8859-5"),
+    ("koi8r.txt", "KOI8-R"),
+    ("win1251.txt", "Windows-1251"),
+])
+def test_detect_encoding_falls_back_to_chardet(file_name, encoding):
+    data = Path(__file__).parent.joinpath("chartests", file_name).read_bytes()
+    detected = MainWindow._detect_encoding(data)
+    assert codecs.lookup(detected).name == codecs.lookup(encoding).name
+
+
+def test_filter_display_keeps_unchanged_text(qtbot, tmp_path):
+    ui = MainWindow()
+    qtbot.addWidget(ui)
+
+    datafile = tmp_path.joinpath("cities.txt")
+    datafile.write_text("City1\nCity2\nCity12\n")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    with patch.object(ui, '_set_display_text',
+                      wraps=ui._set_display_text) as set_display_text:
+        for filter_text in ["City1", "City1", "city1", "ity1"]:
+            ui.line_edit.setText(filter_text)
+            ui.filter_display()
+        # the same lines are matched, so the display is filled once
+        assert set_display_text.call_count == 1
+
+        ui.line_edit.setText("City12")
+        ui.filter_display()
+        assert set_display_text.call_count == 2
+        assert ui.display.toPlainText() == "City12\n"
+
+
+def test_open_file_translates_new_lines(qtbot, tmp_path):
+    ui = MainWindow()
+    qtbot.addWidget(ui)
+
+    datafile = tmp_path.joinpath("new_lines.txt")
+    datafile.write_bytes(b"City1 CRLF\r\nCity2 CR\rCity12 LF\nCity3")
+
+    with patch('Filterer.QFileDialog.getOpenFileName',
+               lambda *args: [datafile.as_posix()]):
+        ui.open_file()
+
+    ui.line_edit.setText("city1")
+    ui.filter_display()
+    assert ui.display.toPlainText() == "City1 CRLF\nCity12 LF\n"
+
+    ui.line_edit.setText("city")
+    ui.filter_display()
+    assert ui.display.toPlainText() == (
+        "City1 CRLF\nCity2 CR\nCity12 LF\nCity3")